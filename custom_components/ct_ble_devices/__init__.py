@@ -39,7 +39,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # 停止自动更新
     updater = hass.data[DOMAIN].get("updater")
     if updater:
-        updater.stop()
+        await updater.async_stop()
         hass.data[DOMAIN].pop("updater")
     
     unload_ok = await hass.config_entries.async_unload_platforms(entry, ["sensor"])
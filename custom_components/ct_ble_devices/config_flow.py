@@ -18,6 +18,23 @@ from .const import (
     SCAN_MODE_DIRECT_BLEAK,
 )
 
+SCAN_MODE_OPTIONS = {
+    SCAN_MODE_DIRECT_BLEAK: "直接 Bleak 扫描（无节流，捕获所有广播）",
+    SCAN_MODE_HA_BLUETOOTH: "Home Assistant 蓝牙集成（可能有节流）",
+}
+
+# 表单结构是静态的，模块加载时构建一次；选项流程通过 suggested values 填入当前值
+DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_ENABLE_SCANNING, default=DEFAULT_ENABLE_SCANNING): bool,
+        vol.Required(CONF_SCAN_MODE, default=DEFAULT_SCAN_MODE): vol.In(SCAN_MODE_OPTIONS),
+        vol.Required(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=300)
+        ),
+        vol.Optional(CONF_DEVICE_NAME_FILTER, default=""): str,
+    }
+)
+
 
 class CTBLEDevicesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for CT BLE Devices."""
@@ -38,21 +55,9 @@ class CTBLEDevicesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 data=user_input,
             )
 
-        data_schema = {
-            vol.Required(CONF_ENABLE_SCANNING, default=DEFAULT_ENABLE_SCANNING): bool,
-            vol.Required(CONF_SCAN_MODE, default=DEFAULT_SCAN_MODE): vol.In({
-                SCAN_MODE_DIRECT_BLEAK: "直接 Bleak 扫描（无节流，捕获所有广播）",
-                SCAN_MODE_HA_BLUETOOTH: "Home Assistant 蓝牙集成（可能有节流）",
-            }),
-            vol.Required(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): vol.All(
-                vol.Coerce(int), vol.Range(min=1, max=300)
-            ),
-            vol.Optional(CONF_DEVICE_NAME_FILTER, default=""): str,
-        }
-
         return self.async_show_form(
             step_id="user",
-            data_schema=vol.Schema(data_schema),
+            data_schema=DATA_SCHEMA,
             errors=errors,
         )
 
@@ -77,34 +82,8 @@ class CTBLEDevicesOptionsFlow(config_entries.OptionsFlow):
 
         return self.async_show_form(
             step_id="init",
-            data_schema=vol.Schema(
-                {
-                    vol.Required(
-                        CONF_ENABLE_SCANNING,
-                        default=self.config_entry.options.get(
-                            CONF_ENABLE_SCANNING, DEFAULT_ENABLE_SCANNING
-                        ),
-                    ): bool,
-                    vol.Required(
-                        CONF_SCAN_MODE,
-                        default=self.config_entry.options.get(
-                            CONF_SCAN_MODE, DEFAULT_SCAN_MODE
-                        ),
-                    ): vol.In({
-                        SCAN_MODE_DIRECT_BLEAK: "直接 Bleak 扫描（无节流，捕获所有广播）",
-                        SCAN_MODE_HA_BLUETOOTH: "Home Assistant 蓝牙集成（可能有节流）",
-                    }),
-                    vol.Required(
-                        CONF_SCAN_INTERVAL,
-                        default=self.config_entry.options.get(
-                            CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
-                        ),
-                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=300)),
-                    vol.Optional(
-                        CONF_DEVICE_NAME_FILTER,
-                        default=self.config_entry.options.get(CONF_DEVICE_NAME_FILTER, ""),
-                    ): str,
-                }
+            data_schema=self.add_suggested_values_to_schema(
+                DATA_SCHEMA, self.config_entry.options
             ),
         )
 
@@ -2,6 +2,13 @@
 DOMAIN = "ct_ble_devices"
 DEFAULT_NAME = "CT BLE Devices"
 
+# 只处理名称以此前缀开头的设备
+GAIT_NAME_PREFIX = "Gait"
+
+# 接收广播数据的 clife_home 服务
+CLIFE_HOME_DOMAIN = "clife_home"
+SERVICE_SUBMIT_BLE_DATA = "submit_ble_data"
+
 # 配置键
 CONF_SCAN_INTERVAL = "scan_interval"
 CONF_DEVICE_NAME_FILTER = "device_name_filter"
@@ -1,10 +1,9 @@
 """Bluetooth scanner for CT BLE Devices."""
-import hashlib
-import json
 import logging
 import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Callable
+from typing import Any, Dict, Optional, Callable, Sequence
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
@@ -13,17 +12,73 @@ from homeassistant.components.bluetooth import (
     BluetoothServiceInfoBleak,
     BluetoothChange,
     BluetoothScanningMode,
+    async_last_service_info,
     async_register_callback,
 )
 from homeassistant.components.bluetooth.match import BluetoothCallbackMatcher
 
 from .const import (
+    CLIFE_HOME_DOMAIN,
     CONF_ENABLE_SCANNING,
     DEFAULT_ENABLE_SCANNING,
+    GAIT_NAME_PREFIX,
+    SERVICE_SUBMIT_BLE_DATA,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+# 已知设备的刷新间隔：广播内容不变时 HA 蓝牙不会再次回调，需定期主动读取最新的 RSSI
+REFRESH_INTERVAL = timedelta(seconds=4)
+
+# 广播缺少对应字段时共享的空值（只读，勿修改）
+_EMPTY_DICT: Dict = {}
+_EMPTY_TUPLE: tuple = ()
+
+# 时间戳格式化缓存：同一秒内的广播复用已格式化的 "年-月-日 时:分:秒" 前缀
+_ts_cache_second: int = -1
+_ts_cache_prefix: str = ""
+
+
+def _format_timestamp(time_unix: float) -> str:
+    """将 Unix 时间格式化为本地时间字符串（精确到毫秒）."""
+    global _ts_cache_second, _ts_cache_prefix
+    second = int(time_unix)
+    if second != _ts_cache_second:
+        _ts_cache_prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        _ts_cache_second = second
+    return f"{_ts_cache_prefix}.{int((time_unix - second) * 1000):03d}"
+
+
+@dataclass(slots=True)
+class AdvertRecord:
+    """一条 Gait 设备广播记录."""
+
+    address: str
+    name: str
+    rssi: int
+    manufacturer_data: Dict[int, bytes]
+    service_data: Dict[str, bytes]
+    service_uuids: Sequence[str]
+    tx_power: Optional[int]
+    source: str
+    timestamp: str
+    time_unix: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        """转换为字典（用于服务调用）."""
+        return {
+            "address": self.address,
+            "name": self.name,
+            "rssi": self.rssi,
+            "manufacturer_data": self.manufacturer_data,
+            "service_data": self.service_data,
+            "service_uuids": self.service_uuids,
+            "tx_power": self.tx_power,
+            "source": self.source,
+            "timestamp": self.timestamp,
+            "time_unix": self.time_unix,
+        }
+
 
 class BLEScanner:
     """Bluetooth Low Energy scanner."""
@@ -32,58 +87,41 @@ class BLEScanner:
         """Initialize the scanner."""
         self.hass = hass
         self.entry = entry
-        self._devices: Dict[str, Dict] = {}
+        self._devices: Dict[str, AdvertRecord] = {}
         self._scanning = False
         self._cancel_bt_cb: Optional[Callable[[], None]] = None
         self._update_callbacks: list[Callable[[], None]] = []
         # 实体创建回调：用于通知sensor平台创建/更新实体
-        self._entity_callbacks: list[Callable[[Dict], None]] = []
-        # 扫描重启定时器取消回调
-        self._restart_scan_cancel: Optional[Callable[[], None]] = None
+        self._entity_callbacks: list[Callable[[AdvertRecord], None]] = []
+        # 已知设备刷新定时器取消回调
+        self._refresh_cancel: Optional[Callable[[], None]] = None
         # 存储每个设备上次发送的数据签名（用于去重，排除RSSI和时间戳）
-        self._last_sent_data_hash: Dict[str, str] = {}
+        self._last_sent_data_hash: Dict[str, tuple] = {}
 
     @property
-    def devices(self) -> Dict[str, Dict]:
+    def devices(self) -> Dict[str, AdvertRecord]:
         """Return discovered devices."""
         return self._devices
     
-    def _get_data_signature(self, device_info: Dict) -> str:
+    def _get_data_signature(self, device_info: AdvertRecord) -> tuple:
         """生成数据签名（排除时间戳和RSSI，用于去重）.
         
+        直接比较原始 bytes，不再转换为十六进制/JSON 再计算 MD5。
+        
         Args:
-            device_info: 设备信息字典
+            device_info: 设备广播记录
             
         Returns:
-            数据签名的 MD5 哈希值（十六进制字符串）
+            可直接用 == 比较的数据签名元组
         """
-        # 复制数据，排除时间戳和RSSI
-        signature_data = {
-            "address": device_info.get("address"),
-            "name": device_info.get("name"),
-            "manufacturer_data": device_info.get("manufacturer_data"),
-            "service_data": device_info.get("service_data"),
-            "service_uuids": sorted(device_info.get("service_uuids", [])) if device_info.get("service_uuids") else [],
-            "tx_power": device_info.get("tx_power"),
-            "source": device_info.get("source"),
-        }
-        
-        # 将 bytes 数据转换为十六进制字符串以便序列化
-        def convert_bytes(obj):
-            if isinstance(obj, bytes):
-                return obj.hex()
-            elif isinstance(obj, dict):
-                return {k: convert_bytes(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_bytes(item) for item in obj]
-            return obj
-        
-        # 转换并生成 JSON 字符串
-        converted_data = convert_bytes(signature_data)
-        json_str = json.dumps(converted_data, sort_keys=True)
-        
-        # 生成 MD5 哈希
-        return hashlib.md5(json_str.encode()).hexdigest()
+        return (
+            device_info.name,
+            tuple(sorted(device_info.manufacturer_data.items())),
+            tuple(sorted(device_info.service_data.items())),
+            tuple(sorted(device_info.service_uuids)),
+            device_info.tx_power,
+            device_info.source,
+        )
 
     async def async_setup(self) -> None:
         """Set up the scanner."""
@@ -99,94 +137,105 @@ class BLEScanner:
             return
 
         self._scanning = True
+        # 回调保持常驻注册，不再定期注销/重新注册（间隙中会丢失广播）
         await self._start_ha_bluetooth_scanning()
-        # 启动扫描重启定时器（每4秒执行一次）
-        self._restart_scan_cancel = async_track_time_interval(
+        # 广播内容不变的设备（只有 RSSI 变化）HA 蓝牙不会再次回调，定期主动刷新
+        self._refresh_cancel = async_track_time_interval(
             self.hass,
-            self._restart_scan_periodically,
-            timedelta(seconds=4),
-            name="ct_ble_devices_restart_scan",
+            self._refresh_known_devices,
+            REFRESH_INTERVAL,
+            name="ct_ble_devices_refresh_devices",
         )
 
 
     async def _start_ha_bluetooth_scanning(self) -> None:
         """Start scanning using HA bluetooth callbacks - no filtering."""
-        @callback
-        def _bt_callback(service_info: BluetoothServiceInfoBleak, change: BluetoothChange) -> None:
-            """Callback for all BLE advertisements - filter by device name prefix."""
-            if change != BluetoothChange.ADVERTISEMENT:
-                return
-            
-            # 获取设备名称
-            name = service_info.name or service_info.advertisement.local_name or ""
-            
-            # 只处理名称前缀为 "Gait" 的设备
-            if not name.startswith("Gait"):
-                return
-            
-            # 构建设备信息
-            device_info = {
-                "address": service_info.address,
-                "name": name,
-                "rssi": service_info.rssi,
-                "manufacturer_data": dict(service_info.manufacturer_data or {}),
-                "service_data": dict(service_info.service_data or {}),
-                "service_uuids": list(service_info.service_uuids or []),
-                "tx_power": getattr(service_info, "tx_power", None),
-                "source": service_info.source,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-                "time_unix": time.time(),
-            }
-            
-            # 更新设备信息
-            is_new_device = service_info.address not in self._devices
-            self._devices[service_info.address] = device_info
-            
-            # 通知实体平台创建或更新实体
-            for callback_func in self._entity_callbacks:
-                try:
-                    callback_func(device_info)
-                except Exception as e:
-                    _LOGGER.error("执行实体回调时出错: %s", e, exc_info=True)
-            
-            if is_new_device:
-                _LOGGER.info("发现新 Gait 设备: %s (地址: %s)", name, service_info.address)
-            
-            # 去重检查：生成数据签名（排除RSSI和时间戳）
-            current_hash = self._get_data_signature(device_info)
-            last_hash = self._last_sent_data_hash.get(service_info.address)
-            
-            # 如果数据相同（签名相同），跳过发送
-            if current_hash == last_hash:
-                # 数据未变化，不发送（RSSI变化会被忽略）
-                return
-            
-            # 数据有变化，更新签名并发送
-            self._last_sent_data_hash[service_info.address] = current_hash
-            
-            # 通过服务调用发送广播数据给 clife_home 集成
-            self.hass.async_create_task(
-                self._send_ble_data_to_service(device_info)
-            )
-
         # 订阅所有蓝牙广播（不设置任何过滤条件）
         # connectable=False 表示接收所有广播（包括不可连接的）
         # BluetoothScanningMode.ACTIVE 表示主动扫描模式
         self._cancel_bt_cb = async_register_callback(
             self.hass,
-            _bt_callback,
+            self._bt_callback,
             BluetoothCallbackMatcher({"connectable": False}),
             BluetoothScanningMode.ACTIVE,
         )
 
-    async def _send_ble_data_to_service(self, device_info: Dict) -> None:
+    @callback
+    def _bt_callback(self, service_info: BluetoothServiceInfoBleak, change: BluetoothChange) -> None:
+        """Callback for all BLE advertisements - filter by device name prefix."""
+        if change != BluetoothChange.ADVERTISEMENT:
+            return
+        
+        self._handle_advertisement(service_info, time.time())
+
+    @callback
+    def _handle_advertisement(self, service_info: BluetoothServiceInfoBleak, time_unix: float) -> None:
+        """处理一条广播（time_unix 为收到该广播的 Unix 时间）."""
+        # 获取设备名称
+        name = service_info.name or service_info.advertisement.local_name or ""
+        
+        # 只处理名称前缀为 "Gait" 的设备（唯一一次前缀检查，_devices 中只有 Gait 设备）
+        if not name.startswith(GAIT_NAME_PREFIX):
+            return
+        
+        # 构建设备信息（时间戳与 time_unix 取自同一时刻）
+        device_info = AdvertRecord(
+            address=service_info.address,
+            name=name,
+            rssi=service_info.rssi,
+            # 直接引用广播中的数据（bytes 不可变，下游只读），不再逐条复制
+            manufacturer_data=service_info.manufacturer_data or _EMPTY_DICT,
+            service_data=service_info.service_data or _EMPTY_DICT,
+            service_uuids=service_info.service_uuids or _EMPTY_TUPLE,
+            tx_power=getattr(service_info, "tx_power", None),
+            source=service_info.source,
+            timestamp=_format_timestamp(time_unix),
+            time_unix=time_unix,
+        )
+        
+        # 更新设备信息
+        is_new_device = service_info.address not in self._devices
+        self._devices[service_info.address] = device_info
+        
+        # 通知实体平台创建或更新实体
+        for callback_func in self._entity_callbacks:
+            try:
+                callback_func(device_info)
+            except Exception as e:
+                _LOGGER.error("执行实体回调时出错: %s", e, exc_info=True)
+        
+        if is_new_device:
+            _LOGGER.info("发现新 Gait 设备: %s (地址: %s)", name, service_info.address)
+        
+        # clife_home 服务未注册时直接跳过，避免每条广播都创建一个注定失败的任务
+        if not self.hass.services.has_service(CLIFE_HOME_DOMAIN, SERVICE_SUBMIT_BLE_DATA):
+            return
+        
+        # 去重检查：生成数据签名（排除RSSI和时间戳）
+        current_hash = self._get_data_signature(device_info)
+        last_hash = self._last_sent_data_hash.get(service_info.address)
+        
+        # 如果数据相同（签名相同），跳过发送
+        if current_hash == last_hash:
+            # 数据未变化，不发送（RSSI变化会被忽略）
+            return
+        
+        # 数据有变化，更新签名并发送
+        self._last_sent_data_hash[service_info.address] = current_hash
+        
+        # 通过服务调用发送广播数据给 clife_home 集成
+        self.hass.async_create_task(
+            self._send_ble_data_to_service(device_info)
+        )
+
+    async def _send_ble_data_to_service(self, device_info: AdvertRecord) -> None:
         """通过服务调用发送 BLE 广播数据给 clife_home 集成."""
         try:
             # 调用 clife_home 集成的 submit_ble_data 服务  submit_ble_data
             await self.hass.services.async_call(
-                "clife_home",
-                "submit_ble_data",
-                service_data=device_info,
+                CLIFE_HOME_DOMAIN,
+                SERVICE_SUBMIT_BLE_DATA,
+                service_data=device_info.as_dict(),
                 blocking=False,  # 非阻塞调用，避免影响扫描性能
             )
         except Exception as e:
@@ -194,10 +243,10 @@ class BLEScanner:
             _LOGGER.debug("调用 clife_home.submit_ble_data 服务失败: %s", e)
 
     @callback
-    def _update_device(self, device_info: Dict) -> None:
+    def _update_device(self, device_info: AdvertRecord) -> None:
         """Update device information in the devices dictionary."""
-        is_new = device_info["address"] not in self._devices
-        self._devices[device_info["address"]] = device_info
+        is_new = device_info.address not in self._devices
+        self._devices[device_info.address] = device_info
         
         # 如果是新设备，通知所有注册的回调函数
         if is_new:
@@ -217,45 +266,45 @@ class BLEScanner:
         if callback_func in self._update_callbacks:
             self._update_callbacks.remove(callback_func)
     
-    def register_entity_callback(self, callback_func: Callable[[Dict], None]) -> None:
+    def register_entity_callback(self, callback_func: Callable[[AdvertRecord], None]) -> None:
         """注册实体回调函数，当发现或更新Gait设备时会被调用."""
         if callback_func not in self._entity_callbacks:
             self._entity_callbacks.append(callback_func)
     
-    def unregister_entity_callback(self, callback_func: Callable[[Dict], None]) -> None:
+    def unregister_entity_callback(self, callback_func: Callable[[AdvertRecord], None]) -> None:
         """取消注册实体回调函数."""
         if callback_func in self._entity_callbacks:
             self._entity_callbacks.remove(callback_func)
 
     @callback
-    def _restart_scan_periodically(self, now: datetime) -> None:
-        """定时器回调：每隔4秒停止并重启扫描."""
+    def _refresh_known_devices(self, now: datetime) -> None:
+        """定时器回调：用 HA 蓝牙缓存的最新广播刷新已知设备（RSSI、时间戳）.
+        
+        时间取自广播本身（service_info.time 为单调时钟），只处理比已记录的更新的广播，
+        已停止广播的设备不会被刷新出新的"最后更新"时间。
+        """
         if not self._scanning:
             return
         
-        # 停止当前扫描
-        if self._cancel_bt_cb:
-            try:
-                self._cancel_bt_cb()
-            except Exception as e:
-                _LOGGER.error("停止扫描时出错: %s", e)
-            self._cancel_bt_cb = None
-        
-        # 重新启动扫描
-        if self._scanning:
-            self.hass.async_create_task(self._restart_scan())
-    
-    async def _restart_scan(self) -> None:
-        """重新启动扫描（异步任务）."""
-        try:
-            await self._start_ha_bluetooth_scanning()
-        except Exception as e:
-            _LOGGER.error("重新启动扫描时出错: %s", e, exc_info=True)
+        # 单调时钟与 Unix 时间的差值，用于换算广播的接收时间
+        monotonic_offset = time.time() - time.monotonic()
+        for address, device_info in list(self._devices.items()):
+            service_info = async_last_service_info(self.hass, address, connectable=False)
+            if service_info is None:
+                continue
+            advert_unix = service_info.time + monotonic_offset
+            if advert_unix > device_info.time_unix:
+                self._handle_advertisement(service_info, advert_unix)
 
     async def async_stop(self) -> None:
         """Stop scanning."""
         self._scanning = False
 
+        # 取消已知设备刷新定时器
+        if self._refresh_cancel:
+            self._refresh_cancel()
+            self._refresh_cancel = None
+
         # 停止 HA 蓝牙集成回调
         if self._cancel_bt_cb:
             try:
@@ -264,9 +313,4 @@ class BLEScanner:
                 _LOGGER.error("取消蓝牙回调时出错: %s", e)
             self._cancel_bt_cb = None
 
-        # 取消扫描重启定时器
-        if self._restart_scan_cancel:
-            self._restart_scan_cancel()
-            self._restart_scan_cancel = None
-
         _LOGGER.info("BLE 扫描器已停止")
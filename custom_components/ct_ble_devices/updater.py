@@ -2,28 +2,81 @@
 import asyncio
 import logging
 import aiohttp
-import aiofiles
-import json
+import orjson
+import os
 import shutil
-from pathlib import Path
+import tempfile
+import zipfile
+from functools import lru_cache
+from pathlib import Path, PurePath, PurePosixPath
 from packaging import version
-from typing import Optional, Tuple
+from typing import IO, AsyncIterator, List, Optional, Set, Tuple, Union
 from datetime import datetime, timedelta
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
+from homeassistant.core import CoreState, Event, HomeAssistant, callback
 from homeassistant.components import persistent_notification
+from homeassistant.helpers.storage import Store
 
 _LOGGER = logging.getLogger(__name__)
 
 # GitHub 仓库信息
 GITHUB_REPO = "StudyDay6/ct_ble_devices"  # 修改为你的仓库
 GITHUB_API_BASE = "https://api.github.com/repos"
+GITHUB_LATEST_RELEASE_URL = f"{GITHUB_API_BASE}/{GITHUB_REPO}/releases/latest"
+GITHUB_SOURCE_ZIP_URL = f"https://github.com/{GITHUB_REPO}/archive/refs/tags/v{{version}}.zip"  # Release 没有 ZIP 附件时使用源码 ZIP
 CHECK_INTERVAL = timedelta(hours=24)  # 每24小时检查一次
 AUTO_UPDATE_ENABLED = True  # 是否启用自动更新
 RETRY_ON_FAILURE = True  # 更新失败后是否立即重试
 MAX_RETRY_ATTEMPTS = 3  # 最大重试次数
 RETRY_DELAY = timedelta(minutes=30)  # 重试延迟时间（30分钟）
+UPDATE_TIMEOUT = timedelta(minutes=10)  # 单次更新中下载、校验、解压和写入临时目录的总时限
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # 下载分块大小（256 KiB）
+ZIP_SPOOL_MAX_SIZE = 16 * 1024 * 1024  # ZIP 内存缓冲上限，超过后转存临时文件（16 MiB）
+STORAGE_VERSION = 1
+STORAGE_KEY = "ct_ble_devices_updater"  # 持久化检查状态（.storage/ct_ble_devices_updater），重启后无需重新检查
+
+# 更新时排除的文件
+EXCLUDE_DIRNAMES = frozenset({'__pycache__', '.git', 'venv'})  # 路径中任一部分等于这些名称
+EXCLUDE_SUFFIXES = frozenset({'.pyc', '.pyo'})  # 文件后缀
+EXCLUDE_NAME_SUBSTRINGS = ('.backup', '.staging')  # 路径中任一部分包含这些字符串
+
+# 所有更新器共享的 HTTP 会话（同一连接池，限制到 GitHub 的并发连接数）
+_shared_session: Optional[aiohttp.ClientSession] = None
+_shared_session_users = 0
+_shared_session_lock = asyncio.Lock()
+
+
+async def _async_acquire_session() -> aiohttp.ClientSession:
+    """获取共享的 HTTP 会话（首次使用时创建），调用方用完后需调用 _async_release_session"""
+    global _shared_session, _shared_session_users
+    async with _shared_session_lock:
+        if _shared_session is None or _shared_session.closed:
+            _shared_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=60),
+                headers={"User-Agent": "ct_ble_devices-updater"},
+                connector=aiohttp.TCPConnector(
+                    limit=4,
+                    limit_per_host=2,
+                    ttl_dns_cache=3600,
+                    keepalive_timeout=75,
+                    enable_cleanup_closed=True,
+                ),
+            )
+        _shared_session_users += 1
+        return _shared_session
+
+
+async def _async_release_session() -> None:
+    """释放共享的 HTTP 会话，最后一个使用者释放时关闭会话"""
+    global _shared_session, _shared_session_users
+    async with _shared_session_lock:
+        _shared_session_users -= 1
+        if _shared_session_users <= 0 and _shared_session is not None:
+            await _shared_session.close()
+            _shared_session = None
+            _shared_session_users = 0
 
 
 async def async_setup_auto_update(hass: HomeAssistant, entry: ConfigEntry) -> Optional['IntegrationUpdater']:
@@ -44,16 +97,16 @@ async def async_setup_auto_update(hass: HomeAssistant, entry: ConfigEntry) -> Op
         integration_path = Path(__file__).parent
         manifest_path = integration_path / "manifest.json"
         current_version = "1.0.0"
+        manifest = None
         
-        if manifest_path.exists():
-            with open(manifest_path) as f:
-                manifest = json.load(f)
-                current_version = manifest.get("version", "1.0.0")
-        else:
+        try:
+            manifest = await hass.async_add_executor_job(_load_json, manifest_path)
+            current_version = manifest.get("version", "1.0.0")
+        except FileNotFoundError:
             _LOGGER.warning("manifest.json 不存在，使用默认版本: %s", current_version)
         
         # 创建并启动更新器
-        updater = IntegrationUpdater(hass, integration_path, current_version, entry.entry_id)
+        updater = IntegrationUpdater(hass, integration_path, current_version, entry.entry_id, manifest)
         await updater.start()
         
         _LOGGER.info("自动更新功能已启动（当前版本: %s）", current_version)
@@ -64,43 +117,297 @@ async def async_setup_auto_update(hass: HomeAssistant, entry: ConfigEntry) -> Op
         return None
 
 
+@lru_cache(maxsize=16)
+def _parse_version(version_str: str) -> version.Version:
+    """解析版本号（带缓存，同一字符串只解析一次）"""
+    return version.parse(version_str)
+
+
+async def _iter_body(
+    response: aiohttp.ClientResponse, chunk_size: int = DOWNLOAD_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """逐块读取响应体，任一时刻只有一个分块在内存中"""
+    while chunk := await response.content.read(chunk_size):
+        yield chunk
+
+
+def _extract_zip(zip_file: IO[bytes], extract_dir: Path, integration_dir: PurePosixPath) -> None:
+    """解压 ZIP 中的集成目录到指定目录（文档、测试等其它文件不解压）"""
+    extract_dir.mkdir()
+    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+        members = None
+        if integration_dir != PurePosixPath("."):
+            prefix = f"{integration_dir}/"
+            members = [name for name in zip_ref.namelist() if name.startswith(prefix)] or None
+        # 集成目录位于 ZIP 根目录（或未能筛选出文件）时完整解压
+        zip_ref.extractall(extract_dir, members=members)
+
+
+def _integration_dir_rank(path: PurePath) -> Tuple[int, int]:
+    """集成目录候选的优先级（越小越优先）
+    
+    1. custom_components/ct_ble_devices/（HACS 标准，可带版本号前缀目录）
+    2. 名为 ct_ble_devices 的目录（兼容旧结构）
+    3. 其它包含 manifest.json 的目录，层级越浅越优先
+    """
+    if path.name == "ct_ble_devices":
+        priority = 0 if path.parent.name == "custom_components" else 1
+    else:
+        priority = 2
+    return priority, len(path.parts)
+
+
+def _inspect_zip(zip_file: IO[bytes]) -> Optional[Tuple[PurePosixPath, dict]]:
+    """解压前直接从 ZIP 中定位集成目录并读取其 manifest.json
+    
+    Returns:
+        (集成目录在 ZIP 中的路径, manifest 内容)；ZIP 中没有包含 manifest.json 和 __init__.py 的集成目录时返回 None
+    """
+    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+        names = zip_ref.namelist()
+        name_set = set(names)
+        # 集成目录的根目录下必须同时有 manifest.json 和 __init__.py（精确匹配条目名）
+        candidates = [
+            PurePosixPath(name).parent
+            for name in names
+            if PurePosixPath(name).name == "manifest.json"
+            and f"{name[:-len('manifest.json')]}__init__.py" in name_set
+        ]
+        if not candidates:
+            return None
+        
+        integration_dir = min(candidates, key=_integration_dir_rank)
+        prefix = "" if integration_dir == PurePosixPath(".") else f"{integration_dir}/"
+        
+        return integration_dir, orjson.loads(zip_ref.read(f"{prefix}manifest.json"))
+
+
+def _apply_update(
+    integration_path: Path,
+    extracted_path: Path,
+    staging_path: Path,
+    required_files: List[str],
+) -> Tuple[int, Set[str]]:
+    """将新版本文件写入临时目录
+    
+    新版本文件直接放入空的临时目录。只有新版本不完整（根目录缺少 __init__.py）时，
+    才把旧版本中新版本没有的文件补进去。
+    
+    Returns:
+        Tuple[int, Set[str]]: (写入的文件数, 缺少的必需文件)
+    """
+    if staging_path.exists():
+        shutil.rmtree(staging_path)
+    
+    file_count = 0
+    found_required_files = set()
+    
+    def _copy_new(src: str, dst: str) -> None:
+        nonlocal file_count
+        file_count += 1
+        # 记录必需文件
+        name = os.path.basename(dst)
+        if name in required_files:
+            found_required_files.add(name)
+        _link_or_copy(src, dst)
+    
+    def _copy_missing(src: str, dst: str) -> None:
+        if not os.path.exists(dst):
+            _link_or_copy(src, dst)
+    
+    # 目录递归、建目录由 copytree 完成，排除规则在每一层目录上应用
+    shutil.copytree(extracted_path, staging_path, ignore=_ignore_excluded, copy_function=_copy_new)
+    
+    # 不完整版本：保留现有文件，补充旧版本中存在、新版本中没有的文件
+    if not (extracted_path / "__init__.py").is_file():
+        shutil.copytree(
+            integration_path,
+            staging_path,
+            ignore=_ignore_excluded,
+            copy_function=_copy_missing,
+            dirs_exist_ok=True,
+        )
+    
+    return file_count, set(required_files) - found_required_files
+
+
+def _ignore_excluded(_directory: str, names: List[str]) -> Set[str]:
+    """copytree 的 ignore 回调：返回当前目录下应该排除的文件/目录名"""
+    return {
+        name
+        for name in names
+        if name in EXCLUDE_DIRNAMES
+        or os.path.splitext(name)[1] in EXCLUDE_SUFFIXES
+        or any(sub in name for sub in EXCLUDE_NAME_SUBSTRINGS)
+    }
+
+
+def _link_or_copy(src: Union[str, Path], dst: Union[str, Path]) -> None:
+    """优先创建硬链接（同一文件系统时无需复制数据），失败时回退为复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _swap_dirs(integration_path: Path, staging_path: Path, old_path: Path) -> None:
+    """原子替换：将当前目录重命名为 .old，再将临时目录重命名为目标目录"""
+    if old_path.exists():
+        shutil.rmtree(old_path)
+    
+    try:
+        integration_path.rename(old_path)
+        staging_path.rename(integration_path)
+    except Exception:
+        # 尝试恢复
+        if old_path.exists() and not integration_path.exists():
+            old_path.rename(integration_path)
+        if staging_path.exists():
+            shutil.rmtree(staging_path)
+        raise
+
+
+def _restore_dir(src: Path, dst: Path) -> None:
+    """用 src 目录替换 dst 目录"""
+    if dst.exists():
+        shutil.rmtree(dst)
+    src.rename(dst)
+
+
+def _remove_dir(path: Path) -> None:
+    """删除目录（不存在时忽略）"""
+    if path.exists():
+        shutil.rmtree(path)
+
+
+def _reset_dir(path: Path) -> None:
+    """创建空目录（已存在时先删除）"""
+    _remove_dir(path)
+    path.mkdir()
+
+
+def _load_json(path: Path) -> dict:
+    """读取 JSON 文件"""
+    return orjson.loads(path.read_bytes())
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """写入 JSON 文件（两空格缩进）"""
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+
 class IntegrationUpdater:
     """集成自动更新器"""
     
-    def __init__(self, hass: HomeAssistant, integration_path: Path, current_version: str, entry_id: Optional[str] = None):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        integration_path: Path,
+        current_version: str,
+        entry_id: Optional[str] = None,
+        manifest: Optional[dict] = None,
+    ):
         """初始化更新器"""
         self.hass = hass
         self.integration_path = integration_path
         self.current_version = current_version
         self.entry_id = entry_id
+        self._manifest: dict = manifest or {}  # 当前安装版本的 manifest（内存缓存）
         self.last_check: Optional[datetime] = None
+        self.last_check_failed = False  # 上次检查是否未能获取到最新版本信息（网络未就绪、GitHub 不可达等）
         self.update_task: Optional[asyncio.Task] = None
+        self._stopped = False  # async_stop 已调用（重载集成时由 update_task 自身触发）
         self.auto_reload = True  # 是否自动重载集成
         self.last_failed_version: Optional[str] = None  # 上次失败的版本
         self.retry_count: int = 0  # 当前重试次数
+        self._session: Optional[aiohttp.ClientSession] = None  # 共享的 HTTP 会话（连接池/keep-alive）
+        self._etag: Optional[str] = None  # 上次 Release 响应的 ETag（条件请求）
+        self._cached_release: Optional[Tuple[str, str]] = None  # 上次解析出的 (版本号, 下载 URL)
+        self._release_digest: Optional[str] = None  # 最新 Release ZIP 附件的摘要（如 "sha256:..."）
+        self._installed_digest: Optional[str] = None  # 上次成功安装的 ZIP 附件的摘要
+        self._installed_version: Optional[str] = None  # 上述附件安装时的版本号（用于判断磁盘上是否仍是该附件的代码）
+        self._update_lock = asyncio.Lock()  # 串行化 check_and_update，防止重复下载/更新
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
         
     async def start(self):
         """启动自动更新检查"""
         if not AUTO_UPDATE_ENABLED:
             return
         
-        # 延迟启动，避免影响集成初始化
-        try:
-            await asyncio.sleep(60)  # 等待60秒后开始检查
-        except asyncio.CancelledError:
-            return
-        
-        # 立即检查一次（启动时检查）
-        await self.check_and_update()  # 忽略返回值，启动时检查失败不影响后续定期检查
-        
-        # 启动定期检查任务
+        # 启动定期检查任务（在后台等待 Home Assistant 启动完成后立即检查一次，不阻塞集成初始化）
         self.update_task = self.hass.async_create_background_task(
             self._periodic_check(),
             "ct_ble_devices_auto_update"
         )
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的 HTTP 会话（首次使用时登记为使用者）"""
+        if self._session is None:
+            self._session = await _async_acquire_session()
+        return self._session
+    
+    async def _wait_for_started(self):
+        """等待 Home Assistant 启动完成"""
+        if self.hass.state is CoreState.running:
+            return
+        
+        started = asyncio.Event()
+        
+        @callback
+        def _on_started(_event: Event) -> None:
+            started.set()
+        
+        unsub = self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, _on_started)
+        try:
+            await started.wait()
+        finally:
+            if not started.is_set():
+                unsub()
+    
+    async def _load_state(self):
+        """从存储中恢复上次的检查状态（ETag、Release 信息、附件摘要、检查时间）"""
+        try:
+            data = await self._store.async_load() or {}
+        except Exception as e:
+            _LOGGER.warning("读取自动更新状态失败: %s", e)
+            return
+        
+        release = data.get("release")
+        if release:
+            self._etag = data.get("etag")
+            self._cached_release = tuple(release)
+            self._release_digest = data.get("release_digest")
+        # 只有磁盘上的版本与记录一致时摘要才有效（手动重装或降级后作废）
+        if data.get("installed_version") == self.current_version:
+            self._installed_digest = data.get("installed_digest")
+            self._installed_version = self.current_version
+        if last_check := data.get("last_check"):
+            self.last_check = datetime.fromisoformat(last_check)
+            self.last_check_failed = data.get("last_check_failed", False)
+    
+    async def _save_state(self):
+        """保存检查状态，Home Assistant 重启后沿用"""
+        try:
+            await self._store.async_save({
+                "etag": self._etag,
+                "release": self._cached_release,
+                "release_digest": self._release_digest,
+                "installed_digest": self._installed_digest,
+                "installed_version": self._installed_version,
+                "last_check": self.last_check.isoformat() if self.last_check else None,
+                "last_check_failed": self.last_check_failed,
+            })
+        except Exception as e:
+            _LOGGER.warning("保存自动更新状态失败: %s", e)
+    
     async def _periodic_check(self):
         """定期检查更新"""
+        try:
+            await self._load_state()
+            await self._wait_for_started()
+        except asyncio.CancelledError:
+            return
+        
         while True:
             try:
                 now = datetime.now()
@@ -123,35 +430,41 @@ class IntegrationUpdater:
                 
                 # 检查是否需要定期检查更新
                 should_check = False
-                if self.last_check is None or (now - self.last_check) > CHECK_INTERVAL:
+                if self.last_check is None or (now - self.last_check) >= self._check_interval():
                     should_check = True
                 
                 # 执行检查或重试
                 if should_retry or should_check:
                     success, attempted_version = await self.check_and_update()
+                    # 无论结果如何都记录检查时间，用于计算下一次检查/重试的时间点
+                    self.last_check = now
+                    await self._save_state()
+                    if self.last_check_failed:
+                        _LOGGER.info("未能获取最新版本信息，将在 %d 分钟后重新检查", RETRY_DELAY.total_seconds() / 60)
+                    
+                    # 更新后重载集成时已调用 async_stop，由新的更新器实例接管
+                    if self._stopped:
+                        break
                     
                     if success:
                         # 更新成功，清除失败记录
                         self.last_failed_version = None
                         self.retry_count = 0
-                        self.last_check = now
                     else:
                         # 更新失败
                         if should_retry:
                             # 这是重试，增加重试计数
                             self.retry_count += 1
-                            self.last_check = now  # 更新检查时间，用于计算下次重试时间
                             _LOGGER.warning("重试更新失败 (第 %d/%d 次)", self.retry_count, MAX_RETRY_ATTEMPTS)
                         elif should_check and attempted_version:
                             # 这是首次检查失败，记录失败版本
                             self.last_failed_version = attempted_version
                             self.retry_count = 1
-                            self.last_check = now
                             if RETRY_ON_FAILURE:
                                 _LOGGER.info("更新失败，将在 %d 分钟后重试", RETRY_DELAY.total_seconds() / 60)
                 
-                # 等待一段时间后再次检查
-                await asyncio.sleep(300)  # 每5分钟检查一次是否需要更新
+                # 直接休眠到下一个需要处理的时间点（定期检查或失败重试）
+                await asyncio.sleep(self._seconds_until_next_check())
                 
             except asyncio.CancelledError:
                 break
@@ -159,35 +472,73 @@ class IntegrationUpdater:
                 _LOGGER.error("自动更新检查出错: %s", e, exc_info=True)
                 await asyncio.sleep(300)  # 出错后等待5分钟再试
     
+    def _check_interval(self) -> timedelta:
+        """定期检查的间隔（上次未能获取到版本信息时按 RETRY_DELAY 重新检查）"""
+        return RETRY_DELAY if self.last_check_failed else CHECK_INTERVAL
+    
+    def _seconds_until_next_check(self) -> float:
+        """计算距离下一次定期检查或失败重试的秒数"""
+        if self.last_check is None:
+            return 1
+        next_deadline = self.last_check + self._check_interval()
+        if RETRY_ON_FAILURE and self.last_failed_version:
+            next_deadline = min(next_deadline, self.last_check + RETRY_DELAY)
+        return max(1, (next_deadline - datetime.now()).total_seconds())
+    
     async def check_and_update(self) -> Tuple[bool, Optional[str]]:
         """检查并更新集成
         
+        已有检查正在进行时直接跳过（不排队等待），避免两次下载同时操作 .staging/.old 目录。
+        
         Returns:
             Tuple[bool, Optional[str]]: (是否成功, 尝试更新的版本号)
         """
+        if self._update_lock.locked():
+            _LOGGER.debug("已有更新检查正在进行，跳过本次检查")
+            return False, None
+        
+        async with self._update_lock:
+            return await self._check_and_update_locked()
+    
+    async def _check_and_update_locked(self) -> Tuple[bool, Optional[str]]:
+        """检查并更新集成（调用方需持有 _update_lock）"""
         try:
             latest_version, download_url = await self._get_latest_version()
+            # 获取失败（返回 None）与"已是最新版本"区分开，失败时不按 CHECK_INTERVAL 等待
+            self.last_check_failed = latest_version is None
             
-            if not latest_version:
+            # 绝大多数检查都没有新版本，字符串相同时无需解析版本号
+            if not latest_version or latest_version == self.current_version:
                 return False, None
             
             # 比较版本
             try:
-                current_ver = version.parse(self.current_version)
-                latest_ver = version.parse(latest_version)
-                
-                if latest_ver <= current_ver:
+                if _parse_version(latest_version) <= _parse_version(self.current_version):
                     return False, None
                 
             except Exception as e:
                 _LOGGER.error("版本比较失败: %s", e)
                 return False, None
             
+            # 重新发布的 Release：ZIP 附件内容与已安装的完全相同，只更新版本号，无需下载
+            # （版本号写入 manifest.json 失败时照常下载更新，否则每次重启后都会重复检查）
+            if (
+                self._release_digest
+                and self._release_digest == self._installed_digest
+                and self._installed_version == self.current_version
+                and await self._update_version_info(latest_version)
+            ):
+                _LOGGER.info("新版本 %s 的内容与已安装版本相同，仅更新版本号", latest_version)
+                self.current_version = latest_version
+                self._installed_version = latest_version
+                return True, latest_version
+            
             _LOGGER.info("发现新版本: %s (当前: %s)，开始更新...", latest_version, self.current_version)
             
             # 自动下载并更新
             if await self._download_and_update(download_url, latest_version):
                 _LOGGER.info("集成已自动更新到版本: %s", latest_version)
+                self.current_version = latest_version
                 await self._notify_update_success(latest_version, reloaded=True)
                 return True, latest_version
             else:
@@ -199,42 +550,58 @@ class IntegrationUpdater:
             return False, None
     
     async def _get_latest_version(self) -> Tuple[Optional[str], Optional[str]]:
-        """获取最新版本信息"""
-        url = f"{GITHUB_API_BASE}/{GITHUB_REPO}/releases/latest"
+        """获取最新版本信息
+        
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (版本号, 下载 URL)，获取失败时为 (None, None)
+        """
+        headers = {"Accept": "application/vnd.github+json"}
+        if self._etag and self._cached_release:
+            # 条件请求：Release 未变化时 GitHub 返回 304，无响应体且不计入速率限制
+            headers["If-None-Match"] = self._etag
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        latest_version = data.get("tag_name", "").lstrip("v")
-                        
-                        if not latest_version:
-                            _LOGGER.warning("无法从响应中提取版本号")
-                            return None, None
-                        
-                        # 获取下载 URL（ZIP 文件）
-                        assets = data.get("assets", [])
-                        download_url = None
-                        for asset in assets:
-                            if asset.get("name", "").endswith(".zip"):
-                                download_url = asset.get("browser_download_url")
-                                break
-                        
-                        # 如果没有找到 ZIP，使用源码 ZIP
-                        if not download_url:
-                            download_url = f"https://github.com/{GITHUB_REPO}/archive/refs/tags/v{latest_version}.zip"
-                        
-                        return latest_version, download_url
-                    elif response.status == 404:
-                        _LOGGER.warning("仓库或 Release 不存在 (404)")
+            session = await self._get_session()
+            async with session.get(
+                GITHUB_LATEST_RELEASE_URL,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status == 304 and self._cached_release:
+                    return self._cached_release
+                elif response.status == 200:
+                    data = await response.json()
+                    latest_version = data.get("tag_name", "").lstrip("v")
+                    
+                    if not latest_version:
+                        _LOGGER.warning("无法从响应中提取版本号")
                         return None, None
+                    
+                    # 获取下载 URL（第一个 ZIP 附件），如果没有找到 ZIP，使用源码 ZIP（源码 ZIP 没有摘要）
+                    zip_asset = next(
+                        (
+                            asset
+                            for asset in data.get("assets", ())
+                            if asset.get("name", "").endswith(".zip") and asset.get("browser_download_url")
+                        ),
+                        None,
+                    )
+                    if zip_asset:
+                        download_url = zip_asset["browser_download_url"]
+                        self._release_digest = zip_asset.get("digest")
                     else:
-                        _LOGGER.warning("获取最新版本失败，状态码: %d", response.status)
-                        return None, None
+                        download_url = GITHUB_SOURCE_ZIP_URL.format(version=latest_version)
+                        self._release_digest = None
+                    
+                    self._etag = response.headers.get("ETag")
+                    self._cached_release = (latest_version, download_url)
+                    return latest_version, download_url
+                elif response.status == 404:
+                    _LOGGER.warning("仓库或 Release 不存在 (404)")
+                    return None, None
+                else:
+                    _LOGGER.warning("获取最新版本失败，状态码: %d", response.status)
+                    return None, None
                         
         except asyncio.TimeoutError:
             _LOGGER.error("获取最新版本超时")
@@ -248,163 +615,101 @@ class IntegrationUpdater:
     
     async def _download_and_update(self, download_url: str, new_version: str) -> bool:
         """下载并更新集成"""
-        import zipfile
-        import tempfile
+        # 所有阻塞的文件系统操作都放到执行器中运行，避免阻塞事件循环
+        run = self.hass.async_add_executor_job
         
         temp_dir = None
+        zip_buffer = None
+        # 替换后旧版本保留在 .old 目录，作为唯一的回滚点（重载成功后清理）
+        old_path = self.integration_path.parent / f"{self.integration_path.name}.old"
+        swapped = False
+        previous_installed = (self._installed_digest, self._installed_version)
         try:
-            # 创建临时目录
-            temp_dir = Path(tempfile.mkdtemp())
-            zip_path = temp_dir / "update.zip"
-            
-            # 下载 ZIP 文件
-            _LOGGER.info("正在下载新版本...")
-            async with aiohttp.ClientSession() as session:
+            async with asyncio.timeout(UPDATE_TIMEOUT.total_seconds()):
+                # 在集成目录旁创建临时目录：与集成目录位于同一文件系统，写入 .staging 时可直接硬链接而无需复制
+                # （以 . 开头的目录不会被 Home Assistant 当作自定义集成加载；使用固定名称，
+                # 上次更新中途退出时残留的目录在这里被清理，不会不断累积）
+                temp_dir = self.integration_path.parent / f".{self.integration_path.name}.update"
+                await run(_reset_dir, temp_dir)
+                
+                # 下载 ZIP 文件（直接写入内存缓冲，超过上限才落盘，解压时无需再从磁盘读回）
+                _LOGGER.info("正在下载新版本...")
+                zip_buffer = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_SIZE)
+                session = await self._get_session()
+                # 总耗时由 UPDATE_TIMEOUT 统一限制，这里只限制单次读取的等待时间
                 async with session.get(
                     download_url,
-                    timeout=aiohttp.ClientTimeout(total=60)
+                    timeout=aiohttp.ClientTimeout(total=None, sock_read=60)
                 ) as response:
                     if response.status != 200:
                         _LOGGER.error("下载失败，状态码: %d", response.status)
                         return False
                     
-                    async with aiofiles.open(zip_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
-            
-            # 解压 ZIP 文件
-            _LOGGER.info("正在解压新版本...")
-            extract_dir = temp_dir / "extract"
-            extract_dir.mkdir()
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            # 找到集成目录（HACS 标准结构：custom_components/ct_ble_devices/）
-            extracted_path = None
-            
-            # 方式1：查找解压根目录下的 custom_components/ct_ble_devices/ 结构（HACS 标准）
-            custom_components_path = extract_dir / "custom_components" / "ct_ble_devices"
-            if custom_components_path.exists() and (custom_components_path / "manifest.json").exists():
-                extracted_path = custom_components_path
-            
-            # 方式2：查找版本号前缀目录下的 custom_components/ct_ble_devices/（如 ct_ble_devices-1.0.1/custom_components/ct_ble_devices/）
-            if not extracted_path:
-                for item in extract_dir.iterdir():
-                    if item.is_dir() and "ct_ble_devices" in item.name.lower():
-                        versioned_custom_components = item / "custom_components" / "ct_ble_devices"
-                        if versioned_custom_components.exists() and (versioned_custom_components / "manifest.json").exists():
-                            extracted_path = versioned_custom_components
-                            break
-            
-            # 方式3：查找直接包含 manifest.json 的目录（兼容旧结构）
-            if not extracted_path:
-                for item in extract_dir.iterdir():
-                    if item.is_dir():
-                        if (item / "manifest.json").exists():
-                            extracted_path = item
-                            break
-                        sub_integration = item / "ct_ble_devices"
-                        if sub_integration.exists() and (sub_integration / "manifest.json").exists():
-                            extracted_path = sub_integration
-                            break
-            
-            if not extracted_path:
-                _LOGGER.error("无法找到集成目录，请确保 ZIP 包含 custom_components/ct_ble_devices/ 或 ct_ble_devices/")
-                return False
-            
-            # 备份当前版本
-            backup_path = self.integration_path.parent / f"{self.integration_path.name}.backup"
-            if backup_path.exists():
-                shutil.rmtree(backup_path)
-            shutil.copytree(self.integration_path, backup_path)
-            _LOGGER.info("已创建备份: %s", backup_path)
-            
-            # 使用临时目录进行原子更新（先完整更新到临时目录，再原子替换）
-            staging_path = self.integration_path.parent / f"{self.integration_path.name}.staging"
-            if staging_path.exists():
-                shutil.rmtree(staging_path)
-            
-            # 先复制当前版本到临时目录（保留现有文件）
-            shutil.copytree(self.integration_path, staging_path)
-            
-            # 更新文件到临时目录（排除某些文件）
-            exclude_files = {'__pycache__', '.git', 'venv', '.backup', '.staging', '*.pyc', '*.pyo'}
-            file_count = 0
-            required_files = ['manifest.json', '__init__.py']  # 必需文件列表
-            found_required_files = set()
-            
-            for item in extracted_path.rglob('*'):
-                if item.is_file():
-                    file_count += 1
-                    # 检查是否应该排除
-                    should_exclude = False
-                    for exclude in exclude_files:
-                        if exclude in str(item):
-                            should_exclude = True
-                            break
-                    
-                    if should_exclude:
-                        continue
-                    
-                    # 计算相对路径
-                    rel_path = item.relative_to(extracted_path)
-                    target_path = staging_path / rel_path
-                    
-                    # 记录必需文件
-                    if rel_path.name in required_files:
-                        found_required_files.add(rel_path.name)
-                    
-                    # 创建目标目录
-                    target_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # 复制文件到临时目录
-                    shutil.copy2(item, target_path)
-            
-            # 验证必需文件是否存在
-            missing_files = set(required_files) - found_required_files
-            if missing_files:
-                _LOGGER.error("新版本缺少必需文件: %s", missing_files)
-                shutil.rmtree(staging_path)
-                return False
-            
-            # 验证 manifest.json 是否有效
-            staging_manifest = staging_path / "manifest.json"
-            if staging_manifest.exists():
+                    # 未超过上限时只是内存复制，直接写入；超过上限后会转存磁盘，改在执行器中写入
+                    written = 0
+                    async for chunk in _iter_body(response):
+                        written += len(chunk)
+                        if written <= ZIP_SPOOL_MAX_SIZE:
+                            zip_buffer.write(chunk)
+                        else:
+                            await run(zip_buffer.write, chunk)
+                
+                # 解压前先从 ZIP 中校验 manifest.json，无效的包不做任何文件操作
                 try:
-                    with open(staging_manifest) as f:
-                        manifest = json.load(f)
-                        if "version" not in manifest or manifest.get("version") != new_version:
-                            _LOGGER.warning("manifest.json 版本号不匹配，将更新为: %s", new_version)
+                    inspected = await run(_inspect_zip, zip_buffer)
                 except Exception as e:
                     _LOGGER.error("验证 manifest.json 失败: %s", e)
-                    shutil.rmtree(staging_path)
                     return False
-            
-            _LOGGER.info("文件更新到临时目录完成: 共处理 %d 个文件", file_count)
-            
-            # 更新版本信息到临时目录
-            await self._update_version_info_in_path(staging_path, new_version)
-            
+                if inspected is None:
+                    _LOGGER.error("无法找到集成目录，请确保 ZIP 包含 custom_components/ct_ble_devices/ 或 ct_ble_devices/")
+                    return False
+                zip_integration_dir, manifest = inspected
+                if manifest.get("version") != new_version:
+                    _LOGGER.warning("manifest.json 版本号不匹配，将更新为: %s", new_version)
+                
+                # 解压 ZIP 文件
+                _LOGGER.info("正在解压新版本...")
+                extract_dir = temp_dir / "extract"
+                await run(_extract_zip, zip_buffer, extract_dir, zip_integration_dir)
+                
+                # 集成目录已在校验 ZIP 时确定（HACS 标准结构：custom_components/ct_ble_devices/），无需再遍历解压目录
+                extracted_path = extract_dir / zip_integration_dir
+                
+                # 使用临时目录进行原子更新（先完整更新到临时目录，再原子替换）
+                staging_path = self.integration_path.parent / f"{self.integration_path.name}.staging"
+                
+                # 更新文件到临时目录（排除某些文件）
+                required_files = ['manifest.json', '__init__.py']  # 必需文件列表
+                file_count, missing_files = await run(
+                    _apply_update, self.integration_path, extracted_path, staging_path, required_files
+                )
+                
+                # 验证必需文件是否存在
+                if missing_files:
+                    _LOGGER.error("新版本缺少必需文件: %s", missing_files)
+                    await run(_remove_dir, staging_path)
+                    return False
+                
+                _LOGGER.info("文件更新到临时目录完成: 共处理 %d 个文件", file_count)
+                
+                # 更新版本信息到临时目录（直接使用解压前从 ZIP 中读出的 manifest）
+                manifest['version'] = new_version
+                await self._write_manifest(staging_path, manifest)
+                
+            # 以下步骤不受 UPDATE_TIMEOUT 限制：超时取消不会停止执行器中的目录替换，
+            # 也不能中断 Home Assistant 的重载（否则配置条目可能停留在半加载状态）
             # 原子替换：先重命名当前目录，再重命名临时目录
-            old_path = self.integration_path.parent / f"{self.integration_path.name}.old"
-            if old_path.exists():
-                shutil.rmtree(old_path)
-            
             try:
-                # 将当前目录重命名为 .old
-                self.integration_path.rename(old_path)
-                # 将临时目录重命名为目标目录（原子操作）
-                staging_path.rename(self.integration_path)
+                await run(_swap_dirs, self.integration_path, staging_path, old_path)
+                swapped = True
+                self._manifest = manifest
+                # 立即保存：重载集成时新的更新器实例会从存储中读取状态
+                self._installed_digest = self._release_digest
+                self._installed_version = new_version
+                await self._save_state()
                 _LOGGER.info("原子更新完成（旧版本保存在 .old 目录，重载成功后清理）")
-                    
             except Exception as e:
                 _LOGGER.error("原子替换失败: %s", e)
-                # 尝试恢复
-                if old_path.exists() and not self.integration_path.exists():
-                    old_path.rename(self.integration_path)
-                if staging_path.exists():
-                    shutil.rmtree(staging_path)
                 raise
             
             # 自动重载集成
@@ -416,9 +721,8 @@ class IntegrationUpdater:
                     if reload_success:
                         # 重载成功，清理旧版本目录
                         try:
-                            if old_path.exists():
-                                shutil.rmtree(old_path)
-                                _LOGGER.info("已清理旧版本目录")
+                            await run(_remove_dir, old_path)
+                            _LOGGER.info("已清理旧版本目录")
                         except Exception as e:
                             _LOGGER.warning("清理旧版本目录失败: %s", e)
                         
@@ -431,23 +735,14 @@ class IntegrationUpdater:
                     # 重载失败，尝试回滚
                     _LOGGER.warning("由于重载失败，尝试回滚到旧版本...")
                     try:
-                        if old_path.exists():
-                            if self.integration_path.exists():
-                                shutil.rmtree(self.integration_path)
-                            old_path.rename(self.integration_path)
+                        if await run(old_path.exists):
+                            await run(_restore_dir, old_path, self.integration_path)
                             _LOGGER.info("已回滚到旧版本")
+                            self._installed_digest, self._installed_version = previous_installed
+                            await self._save_state()
                             await self._notify_update_failed("重载失败，已回滚")
                         else:
-                            # 如果没有 .old 目录，尝试从备份恢复
-                            backup_path = self.integration_path.parent / f"{self.integration_path.name}.backup"
-                            if backup_path.exists():
-                                if self.integration_path.exists():
-                                    shutil.rmtree(self.integration_path)
-                                shutil.copytree(backup_path, self.integration_path)
-                                _LOGGER.info("已从备份恢复")
-                                await self._notify_update_failed("重载失败，已从备份恢复")
-                            else:
-                                await self._notify_update_failed("重载失败且无法回滚，请手动检查")
+                            await self._notify_update_failed("重载失败且无法回滚，请手动检查")
                         return False
                     except Exception as rollback_error:
                         _LOGGER.error("回滚失败: %s", rollback_error, exc_info=True)
@@ -456,8 +751,7 @@ class IntegrationUpdater:
             else:
                 # 无法自动重载，清理旧版本目录（因为已经确认文件更新成功）
                 try:
-                    if old_path.exists():
-                        shutil.rmtree(old_path)
+                    await run(_remove_dir, old_path)
                 except Exception as e:
                     _LOGGER.warning("清理旧版本目录失败: %s", e)
                 await self._notify_restart_required(new_version)
@@ -465,50 +759,57 @@ class IntegrationUpdater:
             return reload_success if self.auto_reload else True
             
         except Exception as e:
-            _LOGGER.error("下载和更新过程中出错: %s", e, exc_info=True)
+            if isinstance(e, TimeoutError):
+                _LOGGER.error("下载和准备新版本超时（超过 %d 秒），已中止", UPDATE_TIMEOUT.total_seconds())
+            else:
+                _LOGGER.error("下载和更新过程中出错: %s", e, exc_info=True)
             
-            # 尝试恢复备份
-            backup_path = self.integration_path.parent / f"{self.integration_path.name}.backup"
-            if backup_path.exists():
-                _LOGGER.warning("尝试恢复备份...")
+            # 已完成替换时，从 .old 目录恢复旧版本（替换前出错时当前版本未被改动）
+            if swapped and await run(old_path.exists):
+                _LOGGER.warning("尝试恢复旧版本...")
                 try:
-                    if self.integration_path.exists():
-                        shutil.rmtree(self.integration_path)
-                    shutil.copytree(backup_path, self.integration_path)
-                    _LOGGER.info("已恢复备份")
+                    await run(_restore_dir, old_path, self.integration_path)
+                    _LOGGER.info("已恢复旧版本")
+                    self._installed_digest, self._installed_version = previous_installed
+                    await self._save_state()
                 except Exception as restore_error:
-                    _LOGGER.error("恢复备份失败: %s", restore_error)
+                    _LOGGER.error("恢复旧版本失败: %s", restore_error)
             
             return False
             
         finally:
-            # 清理临时文件
-            if temp_dir and temp_dir.exists():
+            # 清理临时文件（缓冲可能已转存磁盘，关闭时会删除文件，同样放到执行器中）
+            if zip_buffer is not None:
+                await run(zip_buffer.close)
+            if temp_dir:
                 try:
-                    shutil.rmtree(temp_dir)
+                    await run(_remove_dir, temp_dir)
                 except Exception as e:
                     _LOGGER.warning("清理临时文件失败: %s", e)
     
-    async def _update_version_info(self, new_version: str):
-        """更新版本信息"""
-        await self._update_version_info_in_path(self.integration_path, new_version)
+    async def _update_version_info(self, new_version: str) -> bool:
+        """更新版本信息
+        
+        Returns:
+            bool: 是否已写入 manifest.json（启动时未能读取 manifest 时无法写入）
+        """
+        if not self._manifest:
+            return False
+        manifest = {**self._manifest, 'version': new_version}
+        if not await self._write_manifest(self.integration_path, manifest):
+            return False
+        self._manifest = manifest
+        return True
     
-    async def _update_version_info_in_path(self, target_path: Path, new_version: str):
-        """更新指定路径的版本信息"""
+    async def _write_manifest(self, target_path: Path, manifest: dict) -> bool:
+        """将内存中的 manifest 写入指定路径（无需先从磁盘读取），返回是否成功"""
         try:
-            manifest_path = target_path / "manifest.json"
-            if manifest_path.exists():
-                async with aiofiles.open(manifest_path, 'r') as f:
-                    content = await f.read()
-                    manifest = json.loads(content)
-                    manifest['version'] = new_version
-                
-                async with aiofiles.open(manifest_path, 'w') as f:
-                    await f.write(json.dumps(manifest, indent=2))
-                
-                _LOGGER.info("版本信息已更新: %s", new_version)
+            await self.hass.async_add_executor_job(_write_json, target_path / "manifest.json", manifest)
+            _LOGGER.info("版本信息已更新: %s", manifest.get("version"))
+            return True
         except Exception as e:
             _LOGGER.warning("更新版本信息失败: %s", e)
+            return False
     
     async def _notify_update_success(self, new_version: str, reloaded: bool = False):
         """通知更新成功"""
@@ -517,7 +818,7 @@ class IntegrationUpdater:
         else:
             message = f"CT BLE Devices 已自动更新到版本 {new_version}。\n请重启 Home Assistant 以应用更改。"
         
-        persistent_notification.create(
+        persistent_notification.async_create(
             self.hass,
             message,
             "CT BLE Devices 自动更新",
@@ -528,7 +829,7 @@ class IntegrationUpdater:
         """通知更新失败"""
         message = f"CT BLE Devices 自动更新失败: {reason}\n请检查日志以获取详细信息。"
         
-        persistent_notification.create(
+        persistent_notification.async_create(
             self.hass,
             message,
             "CT BLE Devices 自动更新失败",
@@ -537,7 +838,7 @@ class IntegrationUpdater:
     
     async def _notify_restart_required(self, new_version: str):
         """通知需要重启"""
-        persistent_notification.create(
+        persistent_notification.async_create(
             self.hass,
             f"CT BLE Devices 已更新到版本 {new_version}。\n"
             "⚠️ 请重启 Home Assistant 以应用更改。",
@@ -587,8 +888,19 @@ class IntegrationUpdater:
             _LOGGER.error("重载集成时出错: %s", e, exc_info=True)
             return False
     
-    def stop(self):
-        """停止自动更新"""
-        if self.update_task:
+    async def async_stop(self):
+        """停止自动更新
+        
+        更新完成后的重载运行在 update_task 中，重载会卸载集成并调用到这里。
+        此时不能取消 update_task 自身（否则卸载会在下一个 await 处中断），
+        只做标记，由 update_task 在重载返回后自行退出。
+        """
+        self._stopped = True
+        if self.update_task and self.update_task is not asyncio.current_task():
             self.update_task.cancel()
+        
+        # 释放共享的 HTTP 会话（最后一个使用者负责关闭）
+        if self._session is not None:
+            self._session = None
+            await _async_release_session()
 